@@ -11,33 +11,52 @@ Features:
 
 Usage:
     uvicorn ocr_service:app --host 0.0.0.0 --port 8000
+
+OCR runs in the threadpool, so one worker can overlap uploads with OCR work.
+For more CPU throughput, add worker processes (one per physical core), e.g.
+`--workers 4` or WEB_CONCURRENCY=4. Each worker loads its own copy of the
+OCR models, so lower OCR_CONCURRENCY accordingly. Math-library threads
+are split between workers (see OCR_THREADS in ocr_demo).
 """
 
 from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool, iterate_in_threadpool
 from pydantic import BaseModel, Field
 from typing import Optional, List
-import tempfile
+from collections import OrderedDict
+import asyncio
+import hashlib
+import threading
+import orjson
+import time
 import os
 from datetime import datetime
-from pathlib import Path
 
 # Import OCR functions
 from ocr_demo import (
-    process_receipt_edge,
+    ocr_receipt_text,
+    iter_items_from_text,
+    extract_items_from_text_async,
+    load_image,
+    easyocr_ocr_batch,
+    tesseract_ocr_async,
     TESSERACT_AVAILABLE,
     EASYOCR_AVAILABLE,
     PADDLE_AVAILABLE,
     FLORENCE_AVAILABLE,
-    ONNX_AVAILABLE
+    ONNX_AVAILABLE,
+    OPENVINO_AVAILABLE,
+    warm_up_readers
 )
 
 # Initialize FastAPI
 app = FastAPI(
     title="Receipt OCR Service",
     description="OCR service for receipt parsing with item extraction",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -54,6 +73,13 @@ class OCRConfig:
     DEFAULT_METHOD = "easyocr" if EASYOCR_AVAILABLE else "auto"
     USE_LLM_CLEANING = True
     MAX_FILE_SIZE_MB = 10
+    RESULT_CACHE_SIZE = 256  # OCR results kept per (image, engine, use_llm)
+    DECODED_CACHE_MB = int(os.getenv('OCR_DECODED_CACHE_MB', 256))  # Decoded images kept across engines
+    OCR_CONCURRENCY = int(os.getenv('OCR_CONCURRENCY', os.cpu_count() or 1))  # Max OCR jobs running at once
+    # Dynamic batching of concurrent EasyOCR requests (mainly helps on GPU)
+    ENABLE_BATCHING = os.getenv('OCR_BATCHING', 'false').lower() == 'true'
+    MAX_BATCH_SIZE = int(os.getenv('OCR_MAX_BATCH_SIZE', 8))
+    MAX_BATCH_WAIT_MS = float(os.getenv('OCR_MAX_BATCH_WAIT_MS', 50))
 
 config = OCRConfig()
 
@@ -70,6 +96,13 @@ class OCRResponse(BaseModel):
     method_used: str
     item_count: int
     processing_time_ms: float
+    error: Optional[str] = None
+
+class BatchOCRResponse(BaseModel):
+    success: bool
+    results: List[OCRResponse]
+    file_count: int
+    processing_time_ms: float
 
 class HealthResponse(BaseModel):
     status: str
@@ -85,6 +118,128 @@ class ServiceStats:
 
 stats = ServiceStats()
 
+# LRU cache of OCR results keyed by image content hash, so retries and
+# re-uploads of the same receipt skip the OCR pipeline entirely
+class ResultCache:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def make_key(image_data: bytes, engine: str, use_llm: bool) -> tuple:
+        digest = hashlib.blake2b(image_data, digest_size=16).hexdigest()
+        return (digest, engine, use_llm)
+
+    def get(self, key: tuple) -> Optional[dict]:
+        result = self._entries.get(key)
+        if result is not None:
+            self._entries.move_to_end(key)
+        return result
+
+    def put(self, key: tuple, result: dict):
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+result_cache = ResultCache(config.RESULT_CACHE_SIZE)
+
+# LRU cache of decoded (load_image) arrays keyed by image content hash,
+# bounded by total array bytes. The result cache only helps a re-upload with
+# the same engine; this one also covers the same receipt sent to another
+# engine (e.g. comparing engines, or retrying with a fallback). Decoding runs
+# in the threadpool, hence the lock. Cached arrays are shared between
+# requests, so they are made read-only: an in-place edit raises instead of
+# corrupting another request's input.
+class DecodedImageCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, image_data: bytes):
+        """Decode image_data with load_image, reusing a cached decode."""
+        key = hashlib.blake2b(image_data, digest_size=16).digest()
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+                return image
+
+        image = load_image(image_data)
+        if image.nbytes > self.max_bytes:
+            return image
+        image.flags.writeable = False
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = image
+                self.total_bytes += image.nbytes
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= evicted.nbytes
+        return image
+
+decoded_cache = DecodedImageCache(config.DECODED_CACHE_MB * 1024 * 1024)
+
+# OCR runs in progress, keyed like result_cache, so a duplicate upload that
+# arrives mid-run (e.g. a client retry) waits for it instead of starting again
+inflight_ocr = {}
+
+# Caps CPU-bound OCR jobs in flight across all requests (batch included)
+ocr_semaphore = asyncio.Semaphore(config.OCR_CONCURRENCY)
+
+# Collects concurrent EasyOCR requests into a single batched model call
+class EasyOCRBatcher:
+    def __init__(self, max_batch_size: int, max_wait_ms: float):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = None
+        self.worker = None
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self.worker = asyncio.create_task(self._run())
+
+    async def submit(self, image) -> str:
+        """Queue an image and wait for its OCR text"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((image, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            # Wait up to max_wait for more requests to join the batch
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            images = [image for image, _ in batch]
+            try:
+                async with ocr_semaphore:
+                    texts = await run_in_threadpool(easyocr_ocr_batch, images)
+            except Exception as e:
+                texts = [f"Error: {str(e)}"] * len(batch)
+
+            for (_, future), text in zip(batch, texts):
+                if not future.done():
+                    future.set_result(text)
+
+easyocr_batcher = EasyOCRBatcher(config.MAX_BATCH_SIZE, config.MAX_BATCH_WAIT_MS)
+
+# Set once OCR models are loaded and warmed (see startup_event)
+service_state = {"ready": False}
+
 # ============================================================================
 # API Endpoints
 # ============================================================================
@@ -98,29 +253,232 @@ async def root():
         "status": "running",
         "endpoints": {
             "POST /ocr/receipt": "Process receipt image",
+            "POST /ocr/receipt/stream": "Process receipt image with streamed progress (SSE)",
+            "POST /ocr/batch": "Process multiple receipt images concurrently",
             "GET /health": "Service health check"
         }
     }
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
-    """Health check endpoint"""
-    return HealthResponse(
-        status="healthy",
+    """Health check endpoint (503 while OCR models are still warming up)"""
+    response = HealthResponse(
+        status="healthy" if service_state["ready"] else "warming_up",
         available_engines={
             "tesseract": TESSERACT_AVAILABLE,
             "easyocr": EASYOCR_AVAILABLE,
+            "easyocr-onnx": EASYOCR_AVAILABLE and ONNX_AVAILABLE,
+            "easyocr-openvino": EASYOCR_AVAILABLE and OPENVINO_AVAILABLE,
             "paddleocr": PADDLE_AVAILABLE,
             "florence": FLORENCE_AVAILABLE
         },
         timestamp=datetime.utcnow().isoformat()
     )
 
+    if not service_state["ready"]:
+        return JSONResponse(status_code=503, content=response.dict())
+
+    return response
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+
+async def read_upload(file: UploadFile) -> bytes:
+    """
+    Read an uploaded file into memory, enforcing the size limit.
+
+    Reads in chunks and stops as soon as the limit is exceeded, so an
+    oversized upload is never fully copied into memory.
+    The bytes are handed straight to the OCR pipeline (no temp file).
+    """
+    max_bytes = config.MAX_FILE_SIZE_MB * 1024 * 1024
+
+    def too_large(size: int) -> HTTPException:
+        return HTTPException(
+            status_code=413,
+            detail=f"File too large: {size / (1024 * 1024):.2f}MB (max: {config.MAX_FILE_SIZE_MB}MB)"
+        )
+
+    # Size is known up front when the multipart parser recorded it
+    known_size = getattr(file, 'size', None)
+    if known_size is not None and known_size > max_bytes:
+        raise too_large(known_size)
+
+    content = bytearray()
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        content.extend(chunk)
+        if len(content) > max_bytes:
+            raise too_large(len(content))
+
+    return bytes(content)
+
+
+async def run_ocr(image_data: bytes, engine: Optional[str], use_llm: Optional[bool]) -> dict:
+    """
+    Run the (blocking, CPU-bound) OCR pipeline in the threadpool so the
+    event loop stays free to accept uploads and serialize responses.
+
+    Results are cached by image content hash; failed runs are not cached.
+    Concurrent requests for the same image share one run. The run is its
+    own task and every request awaits it through a shield, so a client
+    that goes away cancels only its own wait, never the shared run.
+    """
+    method = engine or config.DEFAULT_METHOD
+    use_llm = use_llm if use_llm is not None else config.USE_LLM_CLEANING
+
+    cache_key = ResultCache.make_key(image_data, method, use_llm)
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    task = inflight_ocr.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(run_ocr_and_cache(cache_key, image_data, method, use_llm))
+        inflight_ocr[cache_key] = task
+        task.add_done_callback(lambda done: finish_inflight_ocr(cache_key, done))
+
+    return await asyncio.shield(task)
+
+
+async def run_ocr_and_cache(cache_key: tuple, image_data: bytes, method: str, use_llm: bool) -> dict:
+    """One shared OCR run; caches the result unless it failed."""
+    result = await run_ocr_uncached(image_data, method, use_llm)
+    if 'error' not in result:
+        result_cache.put(cache_key, result)
+    return result
+
+
+def finish_inflight_ocr(cache_key: tuple, task: asyncio.Task):
+    """Done callback: drop a finished run from inflight_ocr."""
+    if inflight_ocr.get(cache_key) is task:
+        del inflight_ocr[cache_key]
+    # Mark a failure retrieved, so if every waiter left it isn't logged as
+    # "exception was never retrieved"
+    if not task.cancelled():
+        task.exception()
+
+
+async def run_ocr_uncached(image_data: bytes, method: str, use_llm: bool) -> dict:
+    """Dispatch one OCR run to the batcher, async Tesseract or the threadpool."""
+    if config.ENABLE_BATCHING and method == 'easyocr':
+        result = await run_ocr_batched(image_data, use_llm)
+    elif method == 'tesseract':
+        result = await run_ocr_tesseract_async(image_data, use_llm)
+    else:
+        result = await run_ocr_threadpool(image_data, method, use_llm)
+
+    return result
+
+
+def try_load_image(image_data: bytes):
+    """Decode an upload, or None if it can't be (the engines then report why)."""
+    try:
+        return decoded_cache.load(image_data)
+    except Exception:
+        return None
+
+
+async def run_ocr_threadpool(image_data: bytes, method: str, use_llm: bool) -> dict:
+    """
+    OCR in the threadpool. Returns the same dict as process_receipt_edge.
+
+    Only the OCR stage holds an ocr_semaphore slot: decoding happens before
+    (overlapping other requests' inference) and item extraction after (so
+    an LLM round-trip doesn't keep another image from starting OCR).
+    """
+    image = await run_in_threadpool(try_load_image, image_data)
+
+    async with ocr_semaphore:
+        result = await run_in_threadpool(ocr_receipt_text, image_data, method=method, image=image)
+
+    if 'error' in result:
+        return result
+
+    items = await extract_items_from_text_async(result['raw_text'], use_llm=use_llm)
+    result['items'] = items
+    result['item_count'] = len(items)
+    return result
+
+
+async def run_ocr_batched(image_data: bytes, use_llm: bool) -> dict:
+    """
+    EasyOCR via the dynamic batcher. Returns the same dict as process_receipt_edge.
+    """
+    image = await run_in_threadpool(decoded_cache.load, image_data)
+    raw_text = await easyocr_batcher.submit(image)
+    return await build_ocr_result(raw_text, 'easyocr', use_llm)
+
+
+async def run_ocr_tesseract_async(image_data: bytes, use_llm: bool) -> dict:
+    """
+    Tesseract as an async subprocess. Returns the same dict as process_receipt_edge.
+
+    As in run_ocr_threadpool, only the OCR itself holds an ocr_semaphore
+    slot, not the decode or the LLM item extraction.
+    """
+    image = await run_in_threadpool(try_load_image, image_data)
+
+    async with ocr_semaphore:
+        raw_text = await tesseract_ocr_async(image_data, image=image)
+
+    return await build_ocr_result(raw_text, 'tesseract', use_llm)
+
+
+async def build_ocr_result(raw_text: str, method_used: str, use_llm: bool) -> dict:
+    """Extract items from raw OCR text into the process_receipt_edge result shape."""
+    if raw_text.startswith("Error:"):
+        return {'error': raw_text, 'items': [], 'method_used': None, 'preprocessing': None}
+
+    items = await extract_items_from_text_async(raw_text, use_llm=use_llm)
+    return {
+        'raw_text': raw_text,
+        'items': items,
+        'method_used': method_used,
+        'preprocessing': 'standard',
+        'item_count': len(items)
+    }
+
+
+def item_to_dict(item: dict) -> dict:
+    """Pick the OCRItem fields from an extracted item (no Pydantic validation)"""
+    return {
+        'name': item['name'],
+        'quantity': item.get('quantity', 1),
+        'price': item.get('price')
+    }
+
+
+def build_ocr_response(result: dict, start_time: float, include_raw: bool = True) -> dict:
+    """
+    Convert a process_receipt_edge result into an OCRResponse-shaped dict.
+
+    process_receipt_edge already produces well-formed items, so this skips
+    per-item Pydantic models; endpoints return it via ORJSONResponse.
+    include_raw=False leaves raw_text out (null) to shrink the response.
+    """
+    processing_time_ms = (time.time() - start_time) * 1000
+    stats.total_items_extracted += result['item_count']
+
+    return {
+        'success': True,
+        'items': [item_to_dict(item) for item in result['items']],
+        'raw_text': result.get('raw_text') if include_raw else None,
+        'method_used': result['method_used'],
+        'item_count': result['item_count'],
+        'processing_time_ms': round(processing_time_ms, 2),
+        'error': None
+    }
+
+
 @app.post("/ocr/receipt", response_model=OCRResponse)
 async def process_receipt(
     file: UploadFile = File(..., description="Receipt image file"),
     engine: Optional[str] = "easyocr",
-    use_llm: Optional[bool] = True
+    use_llm: Optional[bool] = True,
+    include_raw: Optional[bool] = True
 ):
     """
     Process a receipt image and extract items.
@@ -129,60 +487,28 @@ async def process_receipt(
         file: Receipt image (JPEG, PNG, WebP, PDF)
         engine: OCR engine ('tesseract' or 'easyocr', default: 'easyocr')
         use_llm: Enable LLM post-processing (default: true)
+        include_raw: Include the raw OCR text (default: true)
 
     Returns:
         OCRResponse with extracted items and metadata
     """
-    import time
     start_time = time.time()
 
-    # Validate file size
-    temp_path = None
-
     try:
         stats.total_requests += 1
 
-        # Save uploaded file to temp location
-        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(file.filename).suffix) as temp_file:
-            content = await file.read()
-            file_size_mb = len(content) / (1024 * 1024)
+        # Read uploaded file into memory
+        image_data = await read_upload(file)
 
-            if file_size_mb > config.MAX_FILE_SIZE_MB:
-                raise HTTPException(
-                    status_code=413,
-                    detail=f"File too large: {file_size_mb:.2f}MB (max: {config.MAX_FILE_SIZE_MB}MB)"
-                )
-
-            temp_file.write(content)
-            temp_path = temp_file.name
-
-        # Process the receipt
-        result = process_receipt_edge(
-            image_path=temp_path,
-            method=engine or config.DEFAULT_METHOD,
-            use_llm=use_llm if use_llm is not None else config.USE_LLM_CLEANING
-        )
+        # Process the receipt (off the event loop)
+        result = await run_ocr(image_data, engine, use_llm)
 
         # Check for errors
         if 'error' in result:
             stats.error_count += 1
             raise HTTPException(status_code=500, detail=result['error'])
 
-        # Calculate processing time
-        processing_time_ms = (time.time() - start_time) * 1000
-        stats.total_items_extracted += result['item_count']
-
-        # Build response
-        response = OCRResponse(
-            success=True,
-            items=[OCRItem(**item) for item in result['items']],
-            raw_text=result.get('raw_text'),
-            method_used=result['method_used'],
-            item_count=result['item_count'],
-            processing_time_ms=round(processing_time_ms, 2)
-        )
-
-        return response
+        return ORJSONResponse(build_ocr_response(result, start_time, include_raw))
 
     except HTTPException:
         raise
@@ -190,13 +516,134 @@ async def process_receipt(
         stats.error_count += 1
         raise HTTPException(status_code=500, detail=f"OCR processing failed: {str(e)}")
 
-    finally:
-        # Cleanup temp file
-        if temp_path and os.path.exists(temp_path):
-            try:
-                os.unlink(temp_path)
-            except:
-                pass
+
+def sse_event(event: str, data: dict) -> str:
+    """Format a Server-Sent Event"""
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+
+@app.post("/ocr/receipt/stream")
+async def process_receipt_stream(
+    file: UploadFile = File(..., description="Receipt image file"),
+    engine: Optional[str] = "easyocr",
+    use_llm: Optional[bool] = True,
+    include_raw: Optional[bool] = True
+):
+    """
+    Process a receipt image, streaming progress as Server-Sent Events.
+
+    Events (in order):
+        received - upload accepted
+        ocr      - raw text is ready ({raw_text, method_used}; raw_text
+                   is null with include_raw=false)
+        item     - one per extracted item ({name, quantity, price})
+        done     - summary ({item_count, processing_time_ms})
+        error    - processing failed ({detail}); ends the stream
+    """
+    start_time = time.time()
+    stats.total_requests += 1
+
+    # Read the upload before streaming so size errors are a normal 413
+    image_data = await read_upload(file)
+
+    async def event_stream():
+        try:
+            yield sse_event("received", {"filename": file.filename})
+
+            async with ocr_semaphore:
+                ocr_result = await run_in_threadpool(
+                    ocr_receipt_text,
+                    image_data,
+                    method=engine or config.DEFAULT_METHOD
+                )
+            if 'error' in ocr_result:
+                stats.error_count += 1
+                yield sse_event("error", {"detail": ocr_result['error']})
+                return
+
+            yield sse_event("ocr", {
+                "raw_text": ocr_result['raw_text'] if include_raw else None,
+                "method_used": ocr_result['method_used']
+            })
+
+            # Items are parsed in the threadpool and sent as each one is ready
+            item_count = 0
+            items = iter_items_from_text(
+                ocr_result['raw_text'],
+                use_llm=use_llm if use_llm is not None else config.USE_LLM_CLEANING
+            )
+            async for item in iterate_in_threadpool(items):
+                item_count += 1
+                yield sse_event("item", item_to_dict(item))
+
+            stats.total_items_extracted += item_count
+            yield sse_event("done", {
+                "item_count": item_count,
+                "processing_time_ms": round((time.time() - start_time) * 1000, 2)
+            })
+
+        except Exception as e:
+            stats.error_count += 1
+            yield sse_event("error", {"detail": f"OCR processing failed: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Stop nginx from buffering the stream
+        }
+    )
+
+
+@app.post("/ocr/batch", response_model=BatchOCRResponse)
+async def process_receipt_batch(
+    files: List[UploadFile] = File(..., description="Receipt image files"),
+    engine: Optional[str] = "easyocr",
+    use_llm: Optional[bool] = True,
+    include_raw: Optional[bool] = True
+):
+    """
+    Process several receipt images concurrently.
+
+    Each image is OCR'd in the threadpool; a failure on one image is
+    reported in its own result and does not fail the whole batch.
+
+    Returns:
+        BatchOCRResponse with one OCRResponse per file (in upload order)
+    """
+    start_time = time.time()
+
+    async def process_one(image_data: bytes) -> dict:
+        file_start = time.time()
+        stats.total_requests += 1
+        try:
+            result = await run_ocr(image_data, engine, use_llm)
+            if 'error' in result:
+                raise RuntimeError(result['error'])
+            return build_ocr_response(result, file_start, include_raw)
+        except Exception as e:
+            stats.error_count += 1
+            return {
+                'success': False,
+                'items': [],
+                'raw_text': None,
+                'method_used': engine or config.DEFAULT_METHOD,
+                'item_count': 0,
+                'processing_time_ms': round((time.time() - file_start) * 1000, 2),
+                'error': str(e)
+            }
+
+    uploads = [await read_upload(file) for file in files]
+
+    results = await asyncio.gather(*[process_one(data) for data in uploads])
+
+    return ORJSONResponse({
+        'success': all(r['success'] for r in results),
+        'results': results,
+        'file_count': len(results),
+        'processing_time_ms': round((time.time() - start_time) * 1000, 2)
+    })
 
 @app.on_event("startup")
 async def startup_event():
@@ -211,11 +658,44 @@ async def startup_event():
     print(f"  - PaddleOCR: {'✓' if PADDLE_AVAILABLE else '✗'}")
     print(f"  - Tesseract: {'✓' if TESSERACT_AVAILABLE else '✗'}")
     print(f"  - Florence-2: {'✓' if FLORENCE_AVAILABLE else '✗'}")
+
     print("="*50)
     print("📖 API Documentation: http://localhost:8000/docs")
     print("📊 Health Check: http://localhost:8000/health")
     print("="*50 + "\n")
 
+    if config.ENABLE_BATCHING:
+        easyocr_batcher.start()
+
+    # Load and warm OCR models in the background so the first request
+    # doesn't pay for it; /health reports 503 until this finishes
+    asyncio.create_task(warm_up_models())
+
+
+async def warm_up_models():
+    """Load OCR models and run a dummy inference, then mark the service ready"""
+    try:
+        # 'auto' tries Florence first, so load it up front in that case
+        status = await run_in_threadpool(
+            warm_up_readers, warm_florence=config.DEFAULT_METHOD == 'auto'
+        )
+        for engine, result in status.items():
+            if result is True:
+                print(f"✓ {engine} warmed up")
+            else:
+                print(f"⚠️  Failed to warm up {engine}: {result}")
+    except Exception as e:
+        print(f"⚠️  Model warm-up failed: {e}")
+    finally:
+        service_state["ready"] = True
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Several worker processes let CPU-bound OCR use more than one core
+    # (each worker loads its own copy of the models)
+    uvicorn.run(
+        "ocr_service:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.getenv("WEB_CONCURRENCY", 1))
+    )
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import ocr_demo / ocr_service the way uvicorn does, from edge-OCR/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,56 @@
+"""
+Regression checks for deskew_image on synthetic receipts.
+
+Run from edge-OCR/: python -m pytest tests
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from ocr_demo import deskew_image
+
+
+def make_receipt(rows: int = 30, width: int = 1200, height: int = 1600) -> np.ndarray:
+    """White paper with rows of printed text and no paper edge to latch onto."""
+    image = np.full((height, width, 3), 255, np.uint8)
+    for i in range(rows):
+        text = f"ITEM {i:02d} WHOLE MILK 2%    QTY {i % 4 + 1}    ${i + 1}.{i * 7 % 100:02d}"
+        cv2.putText(image, text, (60, 80 + i * 48), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 0), 2)
+    return image
+
+
+def rotate(image: np.ndarray, angle: float) -> np.ndarray:
+    h, w = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    return cv2.warpAffine(image, matrix, (w, h), borderValue=(255, 255, 255))
+
+
+def text_skew(image: np.ndarray) -> float:
+    """
+    Skew of the text rows in degrees: the rotation that makes the row
+    profile sharpest (ink concentrated in as few pixel rows as possible).
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    gray = cv2.resize(gray, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA)
+    ink = 255 - gray
+    h, w = ink.shape
+
+    def sharpness(angle):
+        matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+        return np.var(cv2.warpAffine(ink, matrix, (w, h)).sum(axis=1, dtype=np.float64))
+
+    return -max(np.arange(-10, 10.01, 0.5), key=sharpness)
+
+
+@pytest.mark.parametrize("angle", [3, 5, -7])
+def test_deskew_straightens_rotated_text(angle):
+    skewed = rotate(make_receipt(), angle)
+    assert abs(text_skew(skewed) - angle) <= 0.5
+
+    assert abs(text_skew(deskew_image(skewed))) <= 0.5
+
+
+def test_deskew_leaves_straight_text_alone():
+    image = make_receipt()
+    assert deskew_image(image) is image
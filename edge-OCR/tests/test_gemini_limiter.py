@@ -0,0 +1,75 @@
+"""
+GeminiLimiter: async slots are never lost to cancelled waiters, and calls
+are spaced to the configured rate.
+"""
+
+import asyncio
+import time
+
+from ocr_demo import GeminiLimiter
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    async def scenario():
+        limiter = GeminiLimiter(max_concurrency=1, rps=0)
+        holding, release = asyncio.Event(), asyncio.Event()
+
+        async def hold():
+            async with limiter:
+                holding.set()
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await holding.wait()
+
+        waiter = asyncio.create_task(limiter.__aenter__())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        release.set()
+        await holder
+
+        # The only slot must be free again
+        await asyncio.wait_for(limiter.__aenter__(), timeout=1)
+        await limiter.__aexit__(None, None, None)
+
+    asyncio.run(scenario())
+
+
+def test_cancel_during_rate_spacing_releases_slot():
+    async def scenario():
+        limiter = GeminiLimiter(max_concurrency=1, rps=2)
+        async with limiter:
+            pass
+
+        # Next entry must wait ~0.5s for spacing; cancel it mid-wait
+        waiter = asyncio.create_task(limiter.__aenter__())
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        await asyncio.wait_for(limiter.__aenter__(), timeout=1)
+        await limiter.__aexit__(None, None, None)
+
+    asyncio.run(scenario())
+
+
+def test_async_calls_are_spaced_to_rps():
+    async def scenario():
+        limiter = GeminiLimiter(max_concurrency=4, rps=20)
+        start = time.monotonic()
+        for _ in range(4):
+            async with limiter:
+                pass
+        return time.monotonic() - start
+
+    # Three gaps of 1/20s after the first call
+    assert asyncio.run(scenario()) >= 0.14
+
+
+def test_sync_path_still_limits():
+    limiter = GeminiLimiter(max_concurrency=1, rps=0)
+    with limiter:
+        assert not limiter._semaphore.acquire(blocking=False)
+    assert limiter._semaphore.acquire(blocking=False)
@@ -0,0 +1,36 @@
+"""
+Upload decoding dispatches on magic bytes, never on a filename.
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from ocr_demo import load_image, sniff_image_format
+
+
+def encoded(ext: str) -> bytes:
+    image = np.full((40, 60, 3), 200, np.uint8)
+    return cv2.imencode(ext, image)[1].tobytes()
+
+
+@pytest.mark.parametrize("ext, expected", [('.jpg', 'jpeg'), ('.png', 'png'), ('.webp', 'webp')])
+def test_sniff_encoded_images(ext, expected):
+    assert sniff_image_format(encoded(ext)) == expected
+
+
+def test_sniff_pdf_and_unknown():
+    assert sniff_image_format(b'%PDF-1.7\n...') == 'pdf'
+    assert sniff_image_format(b'GIF89a') is None
+    assert sniff_image_format(b'') is None
+
+
+def test_load_image_rejects_pdf():
+    with pytest.raises(ValueError, match="PDF"):
+        load_image(b'%PDF-1.7\n...')
+
+
+@pytest.mark.parametrize("ext", ['.jpg', '.png', '.webp'])
+def test_load_image_decodes_to_bgr(ext):
+    image = load_image(encoded(ext), max_dimension=None, min_dimension=None)
+    assert image.shape == (40, 60, 3)
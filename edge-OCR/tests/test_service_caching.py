@@ -0,0 +1,109 @@
+"""
+Service-side caching: result cache keys, the decoded-image cache, shared
+in-flight runs, and the upload size limit.
+"""
+
+import asyncio
+from io import BytesIO
+
+import cv2
+import numpy as np
+import pytest
+from fastapi import HTTPException, UploadFile
+
+import ocr_service
+from ocr_service import DecodedImageCache, ResultCache, read_upload
+
+
+def png_bytes(value: int = 200, size: int = 64) -> bytes:
+    image = np.full((size, size, 3), value, np.uint8)
+    return cv2.imencode('.png', image)[1].tobytes()
+
+
+def test_result_cache_key_covers_image_engine_and_llm():
+    data = png_bytes()
+    key = ResultCache.make_key(data, 'easyocr', True)
+
+    assert key == ResultCache.make_key(bytes(data), 'easyocr', True)
+    assert key != ResultCache.make_key(png_bytes(100), 'easyocr', True)
+    assert key != ResultCache.make_key(data, 'florence-onnx', True)
+    assert key != ResultCache.make_key(data, 'easyocr', False)
+
+
+def test_result_cache_evicts_least_recently_used():
+    cache = ResultCache(max_size=2)
+    cache.put('a', {'raw_text': 'a'})
+    cache.put('b', {'raw_text': 'b'})
+    cache.get('a')
+    cache.put('c', {'raw_text': 'c'})
+
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+
+
+def test_decoded_cache_shares_one_read_only_array():
+    cache = DecodedImageCache(max_bytes=64 * 1024 * 1024)
+    data = png_bytes()
+
+    first = cache.load(data)
+    assert cache.load(data) is first
+    assert not first.flags.writeable
+    with pytest.raises(ValueError):
+        first[0, 0] = 0
+
+
+def test_decoded_cache_stays_within_byte_budget():
+    one_image = ocr_service.load_image(png_bytes()).nbytes
+    cache = DecodedImageCache(max_bytes=2 * one_image)
+
+    for value in (10, 20, 30):
+        cache.load(png_bytes(value))
+
+    assert cache.total_bytes <= 2 * one_image
+    assert len(cache._entries) == 2
+
+
+def test_duplicate_survives_first_caller_cancelling(monkeypatch):
+    runs = []
+
+    async def fake_uncached(image_data, method, use_llm):
+        runs.append(image_data)
+        await asyncio.sleep(0.1)
+        return {'raw_text': 'MILK 2.99', 'method_used': method}
+
+    monkeypatch.setattr(ocr_service, 'run_ocr_uncached', fake_uncached)
+    monkeypatch.setattr(ocr_service, 'result_cache', ResultCache(8))
+    data = png_bytes()
+
+    async def scenario():
+        first = asyncio.create_task(ocr_service.run_ocr(data, 'tesseract', False))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(ocr_service.run_ocr(data, 'tesseract', False))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        result = await second
+        assert first.cancelled()
+        return result
+
+    result = asyncio.run(scenario())
+
+    assert result['raw_text'] == 'MILK 2.99'
+    assert len(runs) == 1
+    assert ocr_service.inflight_ocr == {}
+    assert ocr_service.result_cache.get(ResultCache.make_key(data, 'tesseract', False)) == result
+
+
+@pytest.mark.parametrize("declared_size", [None, 'actual'])
+def test_read_upload_rejects_oversized_files(monkeypatch, declared_size):
+    monkeypatch.setattr(ocr_service.config, 'MAX_FILE_SIZE_MB', 1)
+    data = b'\0' * (1024 * 1024 + 1)
+    size = len(data) if declared_size == 'actual' else None
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(read_upload(UploadFile(BytesIO(data), size=size)))
+    assert excinfo.value.status_code == 413
+
+
+def test_read_upload_returns_bytes_within_limit():
+    data = png_bytes()
+    assert asyncio.run(read_upload(UploadFile(BytesIO(data)))) == data